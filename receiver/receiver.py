@@ -1,69 +1,157 @@
 """Refined MQTT receiver client with improved configurability and resiliency."""
 
-import json
+import functools
+import hashlib
 import logging
 import os
+import queue
 import shlex
 import signal
+import socket
 import ssl
+import stat
 import subprocess
 import tempfile
 import threading
-import urllib.request
 import shutil
 
+import certifi
+import orjson
 import paho.mqtt.client as mqtt
+from paho.mqtt.packettypes import PacketTypes
+from paho.mqtt.properties import Properties
+import urllib3
 import yaml
 
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader as _YamlLoader
+
 
 DEFAULT_PORT = 8883
+SESSION_EXPIRY_INTERVAL = 3600
+RELOAD_CONNECT_TIMEOUT = 30
+# QoS 1 so the broker queues commands for the persistent session while offline.
+SUBSCRIBE_QOS = 1
 DEFAULT_TOPIC_TEMPLATE = "devices/{thing_name}/commands"
+GROUP_TOPIC_TEMPLATE = "devices/group/{name}/commands"
 ENV_CONFIG_PATH = "GG_CONFIG_PATH"
-
-
-def resolve_config_path(override_path=None):
+ENV_RECEIVER_GROUPS = "RECEIVER_GROUPS"
+INVALID_GROUP_CHARACTERS = ("+", "#", "/")
+ENV_RECEIVE_MAXIMUM = "RECEIVER_RECEIVE_MAXIMUM"
+ENV_UPDATE_TIMEOUT = "RECEIVER_UPDATE_TIMEOUT"
+UPDATE_TERMINATE_GRACE = 10
+DEFAULT_RECEIVE_MAXIMUM = 100
+MAX_RECEIVE_MAXIMUM = 65535
+SOCKET_RCVBUF_SIZE = 1 << 20
+UPDATE_QUEUE_SIZE = 16
+UPDATE_ACTION_MARKER = b'"update"'
+JSON_ESCAPE_MARKER = b"\\u"
+SCRATCH_DIR_PREFIX = "receiver-updates-"
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+DOWNLOAD_TIMEOUT = urllib3.Timeout(connect=5, read=30)
+
+# Environment snapshot that update commands extend; refreshed on config reload.
+_BASE_ENV = dict(os.environ)
+
+# Update command currently running on the worker, so shutdown can stop it.
+_UPDATE_PROCESS_LOCK = threading.Lock()
+_UPDATE_PROCESS = None
+_UPDATES_STOPPED = threading.Event()
+
+# Shared connection pool so repeated updates reuse TCP/TLS connections.
+_HTTP = urllib3.PoolManager(
+    num_pools=4,
+    maxsize=8,
+    cert_reqs="CERT_REQUIRED",
+    ca_certs=certifi.where(),
+)
+
+
+def resolve_config_path(override_path=None, logger=None):
     """Locate the Greengrass config file, honoring overrides and known defaults."""
+    home = os.path.expanduser("~")
     candidates = []
     if override_path:
-        candidates.append(override_path)
+        candidates.append(os.path.expanduser(override_path))
 
     env_path = os.getenv(ENV_CONFIG_PATH)
     if env_path:
-        candidates.append(env_path)
+        candidates.append(os.path.expanduser(env_path))
 
     local_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), "certs", "config.yaml")
     candidates.append(local_path)
 
-    default_path = os.path.join(os.path.expanduser("~"), "greengrass", "v2", "config.yaml")
+    default_path = os.path.join(home, "greengrass", "v2", "config.yaml")
     candidates.append(default_path)
 
     for path in candidates:
-        expanded = os.path.expanduser(path)
-        if os.path.isfile(expanded):
-            return expanded
+        try:
+            if stat.S_ISREG(os.stat(path).st_mode):
+                return path
+        except OSError:
+            pass
+        if logger:
+            logger.debug("No config file at %s", path)
 
     raise FileNotFoundError(
         "Could not locate Greengrass config file. "
-        f"Tried: {', '.join(os.path.expanduser(p) for p in candidates)}"
+        f"Tried: {', '.join(candidates)}"
     )
 
 
+def _dig(data, *keys):
+    """Walk nested dicts by key, returning None as soon as a level is missing."""
+    for key in keys:
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+        if data is None:
+            return None
+    return data
+
+
 def load_config(config_path):
     """Read Greengrass config YAML and extract MQTT-related settings."""
     try:
-        with open(config_path, "r", encoding="utf-8") as config_file:
-            config = yaml.safe_load(config_file) or {}
+        file_stat = os.stat(config_path)
+    except FileNotFoundError as exc:
+        raise FileNotFoundError(f"Config file not found at {config_path}") from exc
+    config = dict(_load_config_cached(config_path, file_stat.st_mtime_ns, file_stat.st_ino))
+    config["groups"] = load_groups()
+    return config
+
+
+def load_groups():
+    """Read receiver group names from the environment, rejecting topic wildcards."""
+    groups = [
+        group.strip()
+        for group in (os.getenv(ENV_RECEIVER_GROUPS) or "").split(",")
+        if group.strip()
+    ]
+    invalid = [group for group in groups if any(char in group for char in INVALID_GROUP_CHARACTERS)]
+    if invalid:
+        raise ValueError(
+            f"Invalid {ENV_RECEIVER_GROUPS} entries (no '+', '#' or '/'): {', '.join(invalid)}"
+        )
+    return groups
+
+
+@functools.lru_cache(maxsize=4)
+def _load_config_cached(config_path, _mtime_ns, _inode):
+    """Parse the config once per (path, mtime, inode); callers receive copies."""
+    try:
+        # Hand libyaml raw bytes so decoding happens in C rather than in a text wrapper.
+        with open(config_path, "rb") as config_file:
+            config = yaml.load(config_file, Loader=_YamlLoader) or {}
     except FileNotFoundError as exc:
         raise FileNotFoundError(f"Config file not found at {config_path}") from exc
     except yaml.YAMLError as exc:
         raise ValueError(f"Failed to parse YAML config at {config_path}") from exc
 
     system_config = config.get("system") or {}
-    nucleus_config = (
-        config.get("services", {})
-        .get("aws.greengrass.Nucleus", {})
-        .get("configuration", {})
-    )
+    nucleus_config = _dig(config, "services", "aws.greengrass.Nucleus", "configuration") or {}
 
     endpoint = nucleus_config.get("iotDataEndpoint") or os.getenv("AWS_IOT_ENDPOINT")
     thing_name = system_config.get("thingName") or os.getenv("GG_THING_NAME")
@@ -107,130 +195,438 @@ def configure_logging(level):
     return logging.getLogger("receiver-client")
 
 
-def build_client(config, topic, logger):
+def download_artifact(url, download_path, expected_sha256=None):
+    """Stream an update artifact to disk, verifying its SHA-256 digest when given."""
+    response = _HTTP.request("GET", url, preload_content=False, timeout=DOWNLOAD_TIMEOUT)
+    try:
+        if response.status >= 400:
+            raise urllib3.exceptions.HTTPError(
+                f"Download failed with HTTP status {response.status}"
+            )
+        content_length = response.headers.get("Content-Length")
+        if content_length and content_length.isdigit():
+            free_bytes = shutil.disk_usage(os.path.dirname(download_path)).free
+            if int(content_length) > free_bytes:
+                raise OSError(
+                    f"Insufficient disk space for artifact ({content_length} bytes, "
+                    f"{free_bytes} free)"
+                )
+        digest = hashlib.sha256()
+        with open(download_path, "wb") as artifact_file:
+            for chunk in response.stream(DOWNLOAD_CHUNK_SIZE):
+                artifact_file.write(chunk)
+                digest.update(chunk)
+        if expected_sha256 and digest.hexdigest() != expected_sha256.lower():
+            raise ValueError(
+                f"Checksum mismatch for artifact: expected {expected_sha256}, "
+                f"got {digest.hexdigest()}"
+            )
+    finally:
+        response.release_conn()
+
+
+def prepare_scratch_dir():
+    """Create this process's private (0700) directory for downloaded update artifacts."""
+    return tempfile.mkdtemp(prefix=SCRATCH_DIR_PREFIX)
+
+
+def remove_work_dir(work_dir, logger):
+    """Delete an update's working directory along with anything its command left behind."""
+    try:
+        shutil.rmtree(work_dir)
+        logger.debug("Removed update working directory %s", work_dir)
+    except FileNotFoundError:
+        pass
+    except OSError:
+        logger.warning("Could not remove update working directory %s", work_dir)
+
+
+@functools.lru_cache(maxsize=256)
+def _split_command(command):
+    """Tokenize an update command, reusing the result for repeated commands."""
+    return tuple(shlex.split(command))
+
+
+def _signal_process_group(process, signum):
+    """Send a signal to every process in an update command's session."""
+    try:
+        os.killpg(process.pid, signum)
+    except ProcessLookupError:
+        pass
+
+
+def run_update_command(cmd, cwd, env, timeout):
+    """Run an update command in its own session and raise if it fails or times out."""
+    global _UPDATE_PROCESS
+    # Register under the lock so a concurrent shutdown cannot miss the process.
+    with _UPDATE_PROCESS_LOCK:
+        if _UPDATES_STOPPED.is_set():
+            raise RuntimeError("Receiver is shutting down, not starting update command")
+        process = subprocess.Popen(
+            cmd, cwd=cwd, env=env, close_fds=True, start_new_session=True
+        )
+        _UPDATE_PROCESS = process
+    try:
+        try:
+            returncode = process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            _signal_process_group(process, signal.SIGKILL)
+            process.wait()
+            raise
+    finally:
+        with _UPDATE_PROCESS_LOCK:
+            _UPDATE_PROCESS = None
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd)
+
+
+def terminate_update_command(logger):
+    """Stop any running update command and its children, and refuse to start new ones."""
+    with _UPDATE_PROCESS_LOCK:
+        _UPDATES_STOPPED.set()
+        process = _UPDATE_PROCESS
+    if process is None:
+        return
+    logger.info("Terminating running update command (pid %s)", process.pid)
+    _signal_process_group(process, signal.SIGTERM)
+    try:
+        process.wait(timeout=UPDATE_TERMINATE_GRACE)
+    except subprocess.TimeoutExpired:
+        logger.warning("Update command did not exit after SIGTERM, killing it")
+    # Children may outlive the group leader, so always finish with SIGKILL.
+    _signal_process_group(process, signal.SIGKILL)
+    process.wait()
+
+
+def handle_update(payload, scratch_dir, command_timeout, logger):
+    """Download an update artifact and run its command in a fresh working directory."""
+    url = payload["url"]
+    command = payload["command"]
+    filename = payload["filename"]
+    work_dir = None
+    try:
+        safe_name = os.path.basename(filename)
+        if not safe_name:
+            raise ValueError("Invalid filename provided")
+        # Each update gets its own directory under the process scratch root, so
+        # commands start clean and their output is removed afterwards.
+        work_dir = tempfile.mkdtemp(dir=scratch_dir)
+        download_path = os.path.join(work_dir, safe_name)
+        download_artifact(url, download_path, payload.get("sha256"))
+        logger.info("Downloaded update artifact to %s", download_path)
+    except Exception:
+        logger.exception("Failed to download update artifact from %s", url)
+        if work_dir:
+            remove_work_dir(work_dir, logger)
+        return
+    try:
+        cmd = list(_split_command(command))
+        env = {**_BASE_ENV, "UPDATE_ARTIFACT_PATH": download_path}
+        run_update_command(cmd, work_dir, env, command_timeout)
+        logger.info("Executed update command: %s", command)
+    except Exception:
+        logger.exception("Update command failed: %s", command)
+    finally:
+        remove_work_dir(work_dir, logger)
+
+
+def update_worker(update_queue, scratch_dir, command_timeout, logger):
+    """Process queued update payloads sequentially off the MQTT network thread."""
+    while True:
+        payload = update_queue.get()
+        try:
+            handle_update(payload, scratch_dir, command_timeout, logger)
+        except Exception:  # noqa: BLE001 - keep the worker alive
+            logger.exception("Unexpected error while processing update")
+        finally:
+            update_queue.task_done()
+
+
+def build_tls_context(config):
+    """Create the mutual-TLS context for the MQTT client, allowing TLS 1.2 and 1.3."""
+    context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH, cafile=config["root_ca_path"])
+    context.load_cert_chain(
+        certfile=config["certificate_path"],
+        keyfile=config["private_key_path"],
+    )
+    context.minimum_version = ssl.TLSVersion.TLSv1_2
+    return context
+
+
+def read_int_env(name, default, logger):
+    """Read a positive integer tuning knob from the environment."""
+    raw_value = os.getenv(name)
+    if not raw_value:
+        return default
+    try:
+        value = int(raw_value)
+    except ValueError:
+        value = 0
+    if value <= 0:
+        logger.warning("Ignoring invalid %s=%r, using %s", name, raw_value, default)
+        return default
+    return value
+
+
+def build_topics(config):
+    """Return the device topic followed by one commands topic per configured group."""
+    topics = [DEFAULT_TOPIC_TEMPLATE.format(thing_name=config["thing_name"])]
+    topics.extend(GROUP_TOPIC_TEMPLATE.format(name=group) for group in config["groups"])
+    return topics
+
+
+def start_update_worker(scratch_dir, logger):
+    """Start the background thread that executes queued update actions."""
+    # Updates run on a dedicated worker so the paho loop keeps servicing keepalives.
+    update_queue = queue.Queue(maxsize=UPDATE_QUEUE_SIZE)
+    threading.Thread(
+        target=update_worker,
+        args=(
+            update_queue,
+            scratch_dir,
+            read_int_env(ENV_UPDATE_TIMEOUT, None, logger),
+            logger,
+        ),
+        name="update-worker",
+        daemon=True,
+    ).start()
+    return update_queue
+
+
+def build_client(config, topics, update_queue, logger):
     """Create the MQTT client with TLS, reconnect settings, and message handlers."""
     thing_name = config["thing_name"]
     endpoint = config["endpoint"]
-    client = mqtt.Client(client_id=thing_name)
-    client.tls_set(
-        ca_certs=config["root_ca_path"],
-        certfile=config["certificate_path"],
-        keyfile=config["private_key_path"],
-        tls_version=ssl.PROTOCOL_TLSv1_2,
+    client = mqtt.Client(
+        mqtt.CallbackAPIVersion.VERSION2,
+        client_id=thing_name,
+        protocol=mqtt.MQTTv5,
+        userdata={"connected": threading.Event()},
     )
+    client.tls_set_context(build_tls_context(config))
     client.tls_insecure_set(False)
     client.reconnect_delay_set(min_delay=1, max_delay=60)
 
-    def on_connect(inner_client, userdata, flags, reason_code):
-        if reason_code == 0:
-            logger.info("Connected to endpoint %s", endpoint)
-            inner_client.subscribe(topic)
-            logger.info("Subscribed to topic %s", topic)
+    def on_socket_open(inner_client, userdata, sock):
+        # Send ACKs and PINGREQs immediately and give bursts of inbound
+        # commands a larger kernel buffer.
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_RCVBUF_SIZE)
+        except OSError:
+            logger.warning("Could not apply socket options to MQTT connection")
+
+    def on_connect(inner_client, userdata, flags, reason_code, properties):
+        if reason_code.is_failure:
+            logger.error("Failed to connect (code=%s): %s", reason_code.value, reason_code)
+            return
+        logger.info("Connected to endpoint %s", endpoint)
+        userdata["connected"].set()
+        # The broker keeps subscriptions for resumed sessions, so only
+        # subscribe when it reports a fresh one.
+        if flags.session_present:
+            logger.info("Resumed persistent session, keeping subscriptions to %s", ", ".join(topics))
         else:
-            logger.error(
-                "Failed to connect (code=%s): %s",
-                reason_code,
-                mqtt.error_string(reason_code),
-            )
+            inner_client.subscribe([(topic, SUBSCRIBE_QOS) for topic in topics])
+            logger.info("Subscribed to topics %s", ", ".join(topics))
 
     def on_message(inner_client, userdata, message):
-        payload_text = message.payload.decode("utf-8", errors="replace")
+        raw = message.payload
+        # Only update actions need the decoded payload; anything that cannot
+        # contain the "update" string, even JSON-escaped, skips parsing entirely.
+        if UPDATE_ACTION_MARKER not in raw and JSON_ESCAPE_MARKER not in raw:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Message on %s (%d bytes): %s",
+                    message.topic,
+                    len(raw),
+                    raw.decode("utf-8", errors="replace"),
+                )
+            return
         try:
-            payload = json.loads(payload_text)
+            payload = orjson.loads(raw)
             logger.info("Message on %s: %s", message.topic, payload)
             # handle file downloads using URL, filename and command to execute
-            if payload.get("action") == "update":
+            if isinstance(payload, dict) and payload.get("action") == "update":
                 url = payload.get("url")
                 command = payload.get("command")
                 filename = payload.get("filename")
                 if not url or not command or not filename:
                     logger.error("Update message missing url, command, or filename")
                     return
-                temp_dir = None
-                try:
-                    safe_name = os.path.basename(filename)
-                    if not safe_name:
-                        raise ValueError("Invalid filename provided")
-                    temp_dir = tempfile.mkdtemp(prefix="receiver-update-")
-                    download_path = os.path.join(temp_dir, safe_name)
-                    with urllib.request.urlopen(url) as response, open(download_path, "wb") as temp_file:
-                        temp_file.write(response.read())
-                    logger.info("Downloaded update artifact to %s", download_path)
-                except Exception:
-                    logger.exception("Failed to download update artifact from %s", url)
-                    if temp_dir:
-                        shutil.rmtree(temp_dir, ignore_errors=True)
-                    return
                 try:
-                    cmd = shlex.split(command)
-                    env = os.environ.copy()
-                    env["UPDATE_ARTIFACT_PATH"] = download_path
-                    subprocess.run(cmd, check=True, env=env, cwd=temp_dir)
-                    logger.info("Executed update command: %s", command)
-                except Exception:
-                    logger.exception("Update command failed: %s", command)
-                finally:
-                    try:
-                        if temp_dir:
-                            shutil.rmtree(temp_dir)
-                            logger.debug("Removed temporary artifact directory %s", temp_dir)
-                    except OSError:
-                        logger.warning("Could not remove temporary artifact directory %s", temp_dir)
-
-        except json.JSONDecodeError:
+                    update_queue.put_nowait(payload)
+                except queue.Full:
+                    logger.error("Update queue full, dropping update from %s", url)
+        except orjson.JSONDecodeError:
             logger.warning(
-                "Received non-JSON payload on %s: %s", message.topic, payload_text
+                "Received non-JSON payload on %s: %s",
+                message.topic,
+                raw.decode("utf-8", errors="replace"),
             )
 
-    def on_disconnect(inner_client, userdata, reason_code):
-        if reason_code == mqtt.MQTT_ERR_SUCCESS:
+    def on_disconnect(inner_client, userdata, flags, reason_code, properties):
+        if reason_code.is_failure:
+            logger.warning("Disconnected unexpectedly (code=%s): %s", reason_code.value, reason_code)
+        else:
             logger.info("Disconnected cleanly")
 
+    client.on_socket_open = on_socket_open
     client.on_connect = on_connect
     client.on_message = on_message
     client.on_disconnect = on_disconnect
     return client
 
 
-def run_client(client, config, logger):
-    """Maintain the MQTT connection until a termination signal is received."""
+def connect_client(client, config, logger):
+    """Open the persistent MQTT session and start the network loop thread."""
+    try:
+        connect_properties = Properties(PacketTypes.CONNECT)
+        connect_properties.SessionExpiryInterval = SESSION_EXPIRY_INTERVAL
+        # Caps how many unacknowledged QoS 1/2 messages the broker sends at once.
+        connect_properties.ReceiveMaximum = min(
+            read_int_env(ENV_RECEIVE_MAXIMUM, DEFAULT_RECEIVE_MAXIMUM, logger),
+            MAX_RECEIVE_MAXIMUM,
+        )
+        client.connect(
+            config["endpoint"],
+            config["port"],
+            clean_start=mqtt.MQTT_CLEAN_START_FIRST_ONLY,
+            properties=connect_properties,
+        )
+    except Exception as exc:  # noqa: BLE001 - surface connection issues
+        logger.exception("Failed to establish MQTT connection: %s", exc)
+        raise
+
+    client.loop_start()
+
+
+def stop_client(client, logger):
+    """Stop the network loop and close the MQTT connection."""
+    logger.info("Stopping MQTT client loop")
+    client.loop_stop()
+    client.disconnect()
+
+
+def refresh_base_env():
+    """Re-snapshot the process environment used for update commands."""
+    global _BASE_ENV
+    _BASE_ENV = dict(os.environ)
+
+
+def reload_config(config_path, config, logger):
+    """Re-read the config file, keeping the current settings if it is unusable."""
+    try:
+        return load_config(config_path)
+    except (OSError, ValueError):
+        logger.exception("Config reload from %s failed, keeping current settings", config_path)
+        return config
+
+
+def credential_stamp(config):
+    """Return stat details of the cert, key, and CA files to spot in-place rotation."""
+    stamp = []
+    for key in ("certificate_path", "private_key_path", "root_ca_path"):
+        try:
+            file_stat = os.stat(config[key])
+            stamp.append((file_stat.st_mtime_ns, file_stat.st_ino, file_stat.st_size))
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+def replace_client(client, config, new_config, update_queue, logger):
+    """Switch to a client for the new config, falling back to the current one on failure."""
+    try:
+        new_client = build_client(new_config, build_topics(new_config), update_queue, logger)
+    except (OSError, ssl.SSLError, ValueError):
+        logger.exception("Reloaded config is unusable, keeping current connection")
+        return client, config
+
+    # Pause the old loop so it does not reconnect and take the client id back
+    # while the new client connects.
+    client.loop_stop()
+    try:
+        connect_client(new_client, new_config, logger)
+    except (OSError, ssl.SSLError, ValueError):
+        logger.error("Could not connect with reloaded config, keeping current client")
+        client.loop_start()
+        return client, config
+
+    # connect() only sends CONNECT; the switch is done once the broker accepts it.
+    if not new_client.user_data_get()["connected"].wait(RELOAD_CONNECT_TIMEOUT):
+        logger.error(
+            "Broker did not accept the reloaded config within %ss, reverting to previous settings",
+            RELOAD_CONNECT_TIMEOUT,
+        )
+        new_client.loop_stop()
+        new_client.disconnect()
+        # The broker may already have dropped the old connection when the new
+        # CONNECT arrived; its resumed loop reconnects with the previous settings.
+        client.loop_start()
+        return client, config
+    client.disconnect()
+    return new_client, new_config
+
+
+def run_client(config_path, config, update_queue, logger):
+    """Maintain the MQTT connection, reloading config on SIGHUP, until terminated."""
     stop_event = threading.Event()
+    reload_event = threading.Event()
 
     def handle_signal(signum, _frame):
         logger.info("Signal %s received, shutting down", signum)
         stop_event.set()
 
+    def handle_reload(signum, _frame):
+        logger.info("Signal %s received, reloading config", signum)
+        reload_event.set()
+
     signal.signal(signal.SIGINT, handle_signal)
     signal.signal(signal.SIGTERM, handle_signal)
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, handle_reload)
 
-    try:
-        client.connect(config["endpoint"], config["port"])
-    except Exception as exc:  # noqa: BLE001 - surface connection issues
-        logger.exception("Failed to establish MQTT connection: %s", exc)
-        raise
-
-    client.loop_start()
+    client = build_client(config, build_topics(config), update_queue, logger)
+    connect_client(client, config, logger)
+    credentials = credential_stamp(config)
     try:
         while not stop_event.is_set():
             stop_event.wait(timeout=1)
+            if not reload_event.is_set():
+                continue
+            reload_event.clear()
+            refresh_base_env()
+            new_config = reload_config(config_path, config, logger)
+            new_credentials = credential_stamp(new_config)
+            if new_config == config and new_credentials == credentials:
+                logger.info("Config unchanged, keeping current connection")
+                continue
+            # TLS settings are fixed per paho client, so rotated endpoints or
+            # credentials need a fresh client rather than a plain reconnect.
+            logger.info("Config changed, reconnecting to %s", new_config["endpoint"])
+            client, config = replace_client(client, config, new_config, update_queue, logger)
+            if config is new_config:
+                credentials = new_credentials
     finally:
-        logger.info("Stopping MQTT client loop")
-        client.loop_stop()
-        client.disconnect()
+        terminate_update_command(logger)
+        stop_client(client, logger)
 
 
 def main():
     """Bootstrap logging, load configuration, and start the MQTT receiver."""
     logger = configure_logging("INFO")
 
-    config_path = resolve_config_path()
+    config_path = resolve_config_path(logger=logger)
     logger.info("Using config at %s", config_path)
 
     config = load_config(config_path)
-    topic = DEFAULT_TOPIC_TEMPLATE.format(thing_name=config["thing_name"])
-
-    client = build_client(config, topic, logger)
-    run_client(client, config, logger)
+    scratch_dir = prepare_scratch_dir()
+    try:
+        update_queue = start_update_worker(scratch_dir, logger)
+        run_client(config_path, config, update_queue, logger)
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
 
 
 if __name__ == "__main__":
@@ -1,19 +1,44 @@
 """Refined AWS IoT Core sender with configurable logging and device targeting."""
 
+import hashlib
 import json
 import logging
+import os
+import tempfile
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 import boto3
+import orjson
+import paho.mqtt.publish as mqtt_publish
 
 
 REGION = "us-east-1"
 RECEIVER_DEVICES = ["Laptop-Core-1"]
 LOG_LEVEL = "INFO"
 IOT_ENDPOINT_OVERRIDE = None
+# When set, commands go once to this group's topic and reach every receiver
+# subscribed to it; RECEIVER_DEVICES is not used for that publish.
+RECEIVER_GROUP = None
+# Optional X.509 credentials; when all three are set, per-device commands are
+# sent over a single MQTT connection instead of one iot-data call per device.
+MQTT_CERTIFICATE_PATH = None
+MQTT_PRIVATE_KEY_PATH = None
+MQTT_ROOT_CA_PATH = None
+MQTT_CLIENT_ID = "sender-final"
+MQTT_PORT = 8883
 ENABLE_BROADCAST = False
 DEFAULT_QOS = 1
 DEFAULT_BROADCAST_TOPIC = "devices/all/commands"
+GROUP_TOPIC_TEMPLATE = "devices/group/{name}/commands"
+INVALID_GROUP_CHARACTERS = ("+", "#", "/")
+MAX_PUBLISH_WORKERS = 16
+ENDPOINT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "sender", "endpoint.json")
+ENDPOINT_CACHE_TTL = 24 * 60 * 60
+
+_CLIENT_LOCK = threading.Lock()
+_IOT_CLIENT = None
 
 
 def configure_logging(level):
@@ -43,9 +68,75 @@ def describe_iot_endpoint(region, logger):
         raise
 
 
+def credentials_identity():
+    """Fingerprint the active AWS profile and access key, since endpoints are per account."""
+    session = boto3.Session()
+    credentials = session.get_credentials()
+    access_key = credentials.access_key if credentials else ""
+    return hashlib.sha256(f"{session.profile_name}:{access_key}".encode("utf-8")).hexdigest()
+
+
+def read_cached_endpoint(region, identity, logger):
+    """Return the cached IoT endpoint for the region and identity if it is still fresh."""
+    try:
+        with open(ENDPOINT_CACHE_PATH, "r", encoding="utf-8") as cache_file:
+            cached = json.load(cache_file)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError):
+        logger.warning("Ignoring unreadable endpoint cache at %s", ENDPOINT_CACHE_PATH)
+        return None
+
+    if not isinstance(cached, dict):
+        return None
+    if cached.get("region") != region or cached.get("identity") != identity:
+        return None
+    timestamp = cached.get("timestamp")
+    if not isinstance(timestamp, (int, float)) or time.time() - timestamp > ENDPOINT_CACHE_TTL:
+        return None
+    return cached.get("endpoint")
+
+
+def write_cached_endpoint(region, identity, endpoint, logger):
+    """Persist the resolved IoT endpoint atomically so later runs skip discovery."""
+    cache_dir = os.path.dirname(ENDPOINT_CACHE_PATH)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=cache_dir, prefix=".endpoint-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as cache_file:
+                json.dump(
+                    {
+                        "region": region,
+                        "identity": identity,
+                        "endpoint": endpoint,
+                        "timestamp": time.time(),
+                    },
+                    cache_file,
+                )
+            os.replace(temp_path, ENDPOINT_CACHE_PATH)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+    except OSError:
+        logger.warning("Could not write endpoint cache at %s", ENDPOINT_CACHE_PATH)
+
+
+def resolve_iot_endpoint(region, logger):
+    """Return the IoT endpoint from the on-disk cache, discovering it when stale."""
+    identity = credentials_identity()
+    endpoint = read_cached_endpoint(region, identity, logger)
+    if endpoint:
+        logger.debug("Using cached IoT endpoint %s for region %s", endpoint, region)
+        return endpoint
+    endpoint = describe_iot_endpoint(region, logger)
+    write_cached_endpoint(region, identity, endpoint, logger)
+    return endpoint
+
+
 def build_iotdata_client(region, endpoint, logger):
     """Create an IoT Data client using either a provided endpoint or a discovered one."""
-    resolved_endpoint = endpoint or describe_iot_endpoint(region, logger)
+    resolved_endpoint = endpoint or resolve_iot_endpoint(region, logger)
     endpoint_url = f"https://{resolved_endpoint}"
     logger.debug("Instantiating IoT Data client for %s", endpoint_url)
     return boto3.client(
@@ -55,34 +146,105 @@ def build_iotdata_client(region, endpoint, logger):
     )
 
 
+def get_iotdata_client(region, endpoint, logger):
+    """Return the process-wide IoT Data client, creating it on first use."""
+    global _IOT_CLIENT
+    with _CLIENT_LOCK:
+        if _IOT_CLIENT is None:
+            _IOT_CLIENT = build_iotdata_client(region, endpoint, logger)
+        return _IOT_CLIENT
+
+
 def load_receiver_devices(device_list):
     """Validate and normalize the list of receiver device IDs."""
     return [device for device in device_list if device]
 
 
-def publish_to_device(client, device_id, payload, qos, logger):
-    """Publish a JSON payload to the commands topic of a single device."""
+def serialize_payload(payload):
+    """Encode a payload once into compact JSON bytes for reuse across publishes."""
+    return orjson.dumps(payload)
+
+
+def publish_to_device(client, device_id, payload_bytes, qos, logger):
+    """Publish a pre-serialized JSON payload to the commands topic of a single device."""
     topic = f"devices/{device_id}/commands"
     try:
-        client.publish(topic=topic, qos=qos, payload=json.dumps(payload))
-        logger.info("Published to %s: %s", topic, payload)
+        client.publish(topic=topic, qos=qos, payload=payload_bytes)
+        logger.info("Published to %s (%d bytes)", topic, len(payload_bytes))
         return True
     except Exception:
         logger.exception("Failed to publish to %s", topic)
         return False
 
 
-def broadcast_command(client, payload, qos, logger):
-    """Publish a JSON payload to the broadcast commands topic."""
+def broadcast_command(client, payload_bytes, qos, logger):
+    """Publish a pre-serialized JSON payload to the broadcast commands topic."""
     try:
-        client.publish(topic=DEFAULT_BROADCAST_TOPIC, qos=qos, payload=json.dumps(payload))
-        logger.info("Broadcasted to %s: %s", DEFAULT_BROADCAST_TOPIC, payload)
+        client.publish(topic=DEFAULT_BROADCAST_TOPIC, qos=qos, payload=payload_bytes)
+        logger.info("Broadcasted to %s (%d bytes)", DEFAULT_BROADCAST_TOPIC, len(payload_bytes))
         return True
     except Exception:
         logger.exception("Broadcast failed for topic %s", DEFAULT_BROADCAST_TOPIC)
         return False
 
 
+def use_mqtt_publisher():
+    """Determine whether MQTT credentials are configured for batch publishing."""
+    return all((MQTT_CERTIFICATE_PATH, MQTT_PRIVATE_KEY_PATH, MQTT_ROOT_CA_PATH))
+
+
+def publish_batch_over_mqtt(endpoint, device_ids, payload_bytes, qos, logger):
+    """Publish a pre-serialized payload to every device over one MQTT/TLS connection."""
+    messages = [
+        {"topic": f"devices/{device_id}/commands", "payload": payload_bytes, "qos": qos}
+        for device_id in device_ids
+    ]
+    try:
+        mqtt_publish.multiple(
+            messages,
+            hostname=endpoint,
+            port=MQTT_PORT,
+            client_id=MQTT_CLIENT_ID,
+            tls={
+                "ca_certs": MQTT_ROOT_CA_PATH,
+                "certfile": MQTT_CERTIFICATE_PATH,
+                "keyfile": MQTT_PRIVATE_KEY_PATH,
+            },
+        )
+        logger.info(
+            "Published to %d devices over MQTT (%d bytes each)", len(messages), len(payload_bytes)
+        )
+        return True
+    except Exception:
+        logger.exception("Batch MQTT publish to %s failed", endpoint)
+        return False
+
+
+def is_valid_group_name(group):
+    """Check that a group name is a single MQTT topic level without wildcards."""
+    return bool(group) and not any(char in group for char in INVALID_GROUP_CHARACTERS)
+
+
+def publish_to_group(client, group, payload_bytes, qos, logger):
+    """Publish a pre-serialized JSON payload once to a device group's commands topic."""
+    if not is_valid_group_name(group):
+        logger.error("Invalid group name %r: must be non-empty without '+', '#' or '/'", group)
+        return False
+    topic = GROUP_TOPIC_TEMPLATE.format(name=group)
+    try:
+        client.publish(topic=topic, qos=qos, payload=payload_bytes)
+        logger.info("Published to group %s (%d bytes)", topic, len(payload_bytes))
+        return True
+    except Exception:
+        logger.exception("Failed to publish to group %s", topic)
+        return False
+
+
+def should_publish_to_group(group):
+    """Determine whether commands target a device group instead of listed devices."""
+    return bool(group)
+
+
 def should_broadcast(flag):
     """Determine whether broadcast publishing is enabled."""
     return bool(flag)
@@ -110,19 +272,37 @@ def build_sample_payload():
 
 
 def main():
-    """Initialize clients, publish sample commands, and optionally broadcast."""
+    """Initialize clients, publish sample commands to devices or their group, and optionally broadcast."""
     logger = configure_logging(LOG_LEVEL)
 
-    iotdata_client = build_iotdata_client(REGION, IOT_ENDPOINT_OVERRIDE, logger)
     receivers = load_receiver_devices(RECEIVER_DEVICES)
     payload = build_sample_payload()
+    payload_bytes = serialize_payload(payload)
+    logger.info("Sending payload: %s", payload)
 
-    for device in receivers:
-        publish_to_device(iotdata_client, device, payload, DEFAULT_QOS, logger)
-        time.sleep(0.2)
+    if should_publish_to_group(RECEIVER_GROUP):
+        # One publish; the broker fans it out to every subscribed group member.
+        iotdata_client = get_iotdata_client(REGION, IOT_ENDPOINT_OVERRIDE, logger)
+        publish_to_group(iotdata_client, RECEIVER_GROUP, payload_bytes, DEFAULT_QOS, logger)
+    elif receivers and use_mqtt_publisher():
+        endpoint = IOT_ENDPOINT_OVERRIDE or resolve_iot_endpoint(REGION, logger)
+        publish_batch_over_mqtt(endpoint, receivers, payload_bytes, DEFAULT_QOS, logger)
+    elif receivers:
+        iotdata_client = get_iotdata_client(REGION, IOT_ENDPOINT_OVERRIDE, logger)
+        # iot-data publishes are independent HTTPS calls, so fan them out concurrently.
+        with ThreadPoolExecutor(max_workers=min(MAX_PUBLISH_WORKERS, len(receivers))) as executor:
+            list(
+                executor.map(
+                    lambda device: publish_to_device(
+                        iotdata_client, device, payload_bytes, DEFAULT_QOS, logger
+                    ),
+                    receivers,
+                )
+            )
 
     if should_broadcast(ENABLE_BROADCAST):
-        broadcast_command(iotdata_client, payload, DEFAULT_QOS, logger)
+        iotdata_client = get_iotdata_client(REGION, IOT_ENDPOINT_OVERRIDE, logger)
+        broadcast_command(iotdata_client, payload_bytes, DEFAULT_QOS, logger)
 
 
 if __name__ == "__main__":